@@ -93,15 +93,22 @@ class KnutAPI(Events):
         response_id, response = KnutAPI.NULL, dict()
 
         if msg_id != KnutAPI.NULL:
+            callback = self.supported.get(msg_id)
+
+            if callback is None:
+                logging.error('Unsupported msg_id for API \'%s\': %s',
+                              self.apiid, msg_id)
+                return response_id, response
+
             try:
-                response_id, response = self.supported[msg_id](msg)
-            except KeyError:
-                logging.error('Unsupported msg_id for API \'{}\': {}'
-                              .format(self.apiid, msg_id))
+                response_id, response = callback(msg)
+            except KeyError as e:
+                logging.error('Message of type \'%s\' for API \'%s\' is '
+                              'missing the key %s.', msg_id, self.apiid, e)
             except TypeError as e:
                 logging.error('Invalid callback function for '
-                              'msg_id \'{}\' and API \'{}\': {}'
-                              .format(msg_id, self.apiid, e))
+                              'msg_id \'%s\' and API \'%s\': %s',
+                              msg_id, self.apiid, e)
 
         response_id = response_id if len(response) > 0 else KnutAPI.NULL
 
@@ -50,13 +50,13 @@ class Room(Events):
         # use the on_push event to push new status to parent object
         self.__events__ = ('on_push')
 
-        logging.debug('Added room to bundle lights: {}'.format(self.room))
+        logging.debug('Added room to bundle lights: %s', self.room)
 
     def add_backend(self, backend: knut.services.light.Light) -> None:
         """Adds a light *backend* to the room."""
         if backend.room != self.room:
-            logging.warning("Back-end is not in room '{}': {}"
-                            .format(self.room, backend.uid))
+            logging.warning("Back-end is not in room '%s': %s",
+                            self.room, backend.uid)
             return
 
         if backend not in self.backends:
@@ -94,12 +94,13 @@ class Room(Events):
         if neither all are on nor off. If the :attr:`state` changed, a
         :const:`ROOM_RESPONSE` will be pushed.
         """
-        state_set = set((light.state) for light in self.backends)
+        lights = iter(self.backends)
+        first = next(lights, None)
 
-        # If all light states are equal, the set has one entry being the state.
-        # Using pop() returns that entry and the light state can be set.
-        if len(state_set) == 1:
-            state = 1 if state_set.pop() else -1
+        # compare the states with the first light until one differs
+        if (first is not None
+                and all(light.state == first.state for light in lights)):
+            state = 1 if first.state else -1
         else:
             state = 0
 
@@ -177,8 +178,8 @@ class Light(KnutAPI):
                                  "'location', 'uid']")
 
         if backend.uid in self.backends.keys():
-            logging.warning('Back-end identifier is not unique: {}'
-                            .format(backend.uid))
+            logging.warning('Back-end identifier is not unique: %s',
+                            backend.uid)
             return
 
         self.backends[backend.uid] = backend
@@ -195,12 +196,13 @@ class Light(KnutAPI):
             self.backends[backend.uid].on_change += self.notifier
 
     def fetch(self):
-        state_set = set((light.state) for light in self.backends.values())
+        lights = iter(self.backends.values())
+        first = next(lights, None)
 
-        # If all light states are equal, the set has one entry being the state.
-        # Using pop() returns that entry and the light state can be set.
-        if len(state_set) == 1:
-            light_state_all = 1 if state_set.pop() else -1
+        # compare the states with the first light until one differs
+        if (first is not None
+                and all(light.state == first.state for light in lights)):
+            light_state_all = 1 if first.state else -1
         else:
             light_state_all = 0
 
@@ -230,7 +232,7 @@ class Light(KnutAPI):
         self.rooms[light.room].fetch()
 
         # push the message to registered objects
-        logging.debug('Push status to listeners: {}'.format(uid))
+        logging.debug('Push status to listeners: %s', uid)
         self.on_push(Light.apiid, Light.LIGHT_STATUS_RESPONSE,
                      self.backends[uid].status())
 
@@ -241,8 +243,7 @@ class Light(KnutAPI):
         uid = msg['id']
 
         if uid not in self.backends.keys():
-            logging.warning('Unknown light service requested: {}'
-                            .format(uid))
+            logging.warning('Unknown light service requested: %s', uid)
         else:
             response = self.backends[uid].status()
             response_id = Light.LIGHT_STATUS_RESPONSE
@@ -268,8 +269,7 @@ class Light(KnutAPI):
         uid = msg['id']
 
         if uid not in self.backends.keys():
-            logging.warning('Unknown light service requested: {}'
-                            .format(uid))
+            logging.warning('Unknown light service requested: %s', uid)
         else:
             light = self.backends[uid]
             light.status_setter(msg)
@@ -16,10 +16,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import glob
-import json
 import os
 import logging
 
+from knut.core.utility import json_loads
 from .knutapi import KnutAPI
 import knut.services.task
 
@@ -100,17 +100,18 @@ class Task(KnutAPI):
         task_dir = os.path.expanduser(task_dir)
         tasks = glob.glob(os.path.join(task_dir, '*.json'))
 
-        logging.debug('Load tasks from \'%s\'...' % task_dir)
+        logging.debug('Load tasks from \'%s\'...', task_dir)
 
         for task in tasks:
-            with open(task) as f:
-                data = json.load(f)
+            # the tasks are written as UTF-8 encoded JSON bytes
+            with open(task, 'rb') as f:
+                data = json_loads(f.read())
 
-                if 'id' not in data.keys():
+                if 'id' not in data:
                     logging.warning(
-                        'Tried to load invalid task \'%s\'.' % task)
+                        'Tried to load invalid task \'%s\'.', task)
                 else:
-                    logging.debug('Loading task from file \'%s\'...' % task)
+                    logging.debug('Loading task from file \'%s\'...', task)
                     uid = data['id']
                     loaded_task = knut.services.task.Task(uid, task_dir)
                     loaded_task.update_task(data)
@@ -121,13 +122,13 @@ class Task(KnutAPI):
         response = dict()
         response_id = Task.NULL
 
-        if 'id' not in msg.keys():
+        if 'id' not in msg:
             logging.warning('Invalid TASK_REQUEST received...')
         else:
             uid = msg['id']
 
-            if uid not in self.tasks.keys():
-                logging.warning('No task with the uid \'%s\' known.' % uid)
+            if uid not in self.tasks:
+                logging.warning('No task with the uid \'%s\' known.', uid)
             else:
                 response = self.tasks[uid].task()
                 response_id = Task.TASK_RESPONSE
@@ -138,12 +139,12 @@ class Task(KnutAPI):
         response = dict()
         response_id = Task.NULL
 
-        if 'id' not in msg.keys():
+        if 'id' not in msg:
             logging.warning('Invalid TASK_RESPONSE received...')
         else:
             uid = msg['id']
 
-            if uid not in self.tasks.keys():
+            if uid not in self.tasks:
                 if uid == '' or uid is None:
                     new_task = knut.services.task.Task(task_dir=self.task_dir)
                     new_task.update_task(msg)
@@ -153,7 +154,7 @@ class Task(KnutAPI):
                     # send a ALL_TASKS_RESPONSE after adding the new task
                     response_id, response = self.__handle_all_task_request(msg)
                 else:
-                    logging.warning('No task with the uid \'%s\' known.' % uid)
+                    logging.warning('No task with the uid \'%s\' known.', uid)
             else:
                 self.tasks[uid].update_task(msg)
                 response_id, response = (Task.TASK_RESPONSE,
@@ -179,7 +180,7 @@ class Task(KnutAPI):
         return Task.ALL_TASKS_RESPONSE, response
 
     def __handle_delete_task_request(self, msg):
-        if 'id' not in msg.keys():
+        if 'id' not in msg:
             logging.warning('Invalid DELETE_TASK_REQUEST received...')
         elif msg['id'] in self.tasks:
             uid = msg['id']
@@ -190,11 +191,11 @@ class Task(KnutAPI):
             self.on_push(Task.apiid, response_id, response)
         else:
             logging.warning(
-                'Can\'t delete unknown task \'%s\'...' % msg['id'])
+                'Can\'t delete unknown task \'%s\'...', msg['id'])
 
         return Task.NULL, dict()
 
     def __reminder(self, uid):
-        logging.debug('Push reminder for \'%s\'...' % uid)
+        logging.debug('Push reminder for \'%s\'...', uid)
         msg = {'id': uid, 'reminder': self.tasks[uid].reminder}
         self.on_push(Task.apiid, Task.REMINDER, msg)
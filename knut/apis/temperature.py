@@ -282,7 +282,7 @@ class Temperature(KnutAPI):
 
         if backend.uid in self.backends.keys():
             logging.warning('Unique name \'%s\' is not unique and backend is'
-                            ' not add.' % backend.uid)
+                            ' not add.', backend.uid)
             return
 
         self.backends[backend.uid] = backend
@@ -320,8 +320,8 @@ class Temperature(KnutAPI):
             condition = WEATHER_ICON_MAP[self.backends[uid].condition]
             temperature = self.backends[uid].temperature
         except KeyError as exception:
-            logging.warning('Status of back-end \'%s\' is unkown. %s'
-                            % (uid, exception))
+            logging.warning('Status of back-end \'%s\' is unkown. %s',
+                            uid, exception)
 
         return {
             'id': uid,
@@ -356,8 +356,9 @@ class Temperature(KnutAPI):
             uid = msg['id']
             backend = self.backends[uid]
 
-            response['temperature'] = backend.history[0]
-            response['time'] = backend.history[1]
+            history = backend.history
+            response['temperature'] = history[0]
+            response['time'] = history[1]
             response['id'] = uid
         except KeyError:
             logging.warning('Received temperature history request for unknown' \
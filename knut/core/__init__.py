@@ -29,7 +29,9 @@ configuration and integration into Knut.
 
    KnutConfig
    KnutObject
+   KnutScheduler
 """
 
 from .base import KnutObject
 from .config import KnutConfig
+from .scheduler import KnutScheduler
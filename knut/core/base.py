@@ -28,8 +28,7 @@ class KnutObject(yaml.YAMLObject):
         node_map = loader.construct_mapping(node, deep=True)
 
         try:
-            module = importlib.__import__(node_map['module'],
-                                          fromlist=[node_map['class']])
+            module = importlib.import_module(node_map['module'])
             knut_object = getattr(module, node_map['class'])
 
             del node_map['module']
@@ -40,3 +39,7 @@ class KnutObject(yaml.YAMLObject):
             pass
 
     yaml.add_constructor(yaml_tag, from_yaml, Loader=yaml.SafeLoader)
+
+    # the C loader is only available if PyYAML is build with LibYAML
+    if hasattr(yaml, 'CSafeLoader'):
+        yaml.add_constructor(yaml_tag, from_yaml, Loader=yaml.CSafeLoader)
@@ -20,8 +20,9 @@ import logging
 import yaml
 
 from .base import KnutObject
-import knut.server.tcpserver
-import knut.services.local
+
+# use the fast LibYAML based loader if PyYAML is build with it
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
 
 
 class KnutConfig(KnutObject):
@@ -80,17 +81,22 @@ class KnutConfig(KnutObject):
         """Loads all configurations from a file."""
         try:
             with open(self.file, 'r') as f:
-                config = yaml.load(f, Loader=yaml.SafeLoader)
+                config = yaml.load(f, Loader=_Loader)
                 for key, item in config.items():
                     self.config[key] = item
         except (FileNotFoundError, TypeError) as e:
-            logging.error('Failed to load configuration: {}: {}'
-                          .format(self.file, e))
+            logging.error('Failed to load configuration: %s: %s',
+                          self.file, e)
             logging.warning('Using fail-safe configuration.')
             self.config = self.failsafe()
 
     def failsafe(self) -> dict:
         """Returns a fail-safe configuration."""
+        # imported only when needed, since e.g. the local service loads astropy
+        import knut.apis
+        import knut.server.tcpserver
+        import knut.services.local
+
         return {
             'server': knut.server.tcpserver.KnutTCPServer(),
             'task': knut.apis.Task(),
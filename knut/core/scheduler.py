@@ -0,0 +1,174 @@
+"""
+Copyright (C) 2020  Joe Pearson
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class KnutScheduler():
+    """Schedule the jobs of all services from one thread.
+
+    Each job has a key and is due at a time in seconds since the epoch. The
+    jobs which are due at once and share the same callback are passed together
+    to their callback as a list of keys. A job can be repeated every
+    *interval* seconds.
+
+    The callbacks are run in a separate thread, so that a callback which
+    blocks, e.g. on network I/O or while pushing to clients, does not delay
+    the other jobs. A repeated job is scheduled again once its callback
+    returns, so that two runs of a job never overlap.
+
+    Instead of sleeping until a deadline that was computed once against the
+    system time, the scheduler waits at most :const:`RESYNC` seconds at once
+    and compares the jobs against ``time.time()`` again. If the system clock
+    is stepped, e.g. by NTP after a boot, the jobs are still run on time.
+
+    An exception raised by a callback is logged and does not stop the
+    scheduler.
+    """
+
+    RESYNC = 60
+    """The maximum time in seconds to wait before re-checking the jobs."""
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__counter = itertools.count()  # orders jobs which are due at once
+        self.__heap = list()
+        self.__jobs = dict()
+        self.__running = set()  # the keys of the jobs which are run
+        self.__thread = None
+
+    def schedule(self, key, when, callback, interval=None):
+        """Call *callback* with the *key* at *when* in seconds since the epoch.
+
+        If an *interval* in seconds is given, the job is repeated until it is
+        cancelled. A job that was previously scheduled for the *key* is
+        replaced.
+        """
+        with self.__condition:
+            self.__cancel(key)
+
+            # the entry is a list to allow marking it as cancelled in the heap
+            job = [when, next(self.__counter), key, callback, interval, False]
+            self.__jobs[key] = job
+            heapq.heappush(self.__heap, job)
+
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run,
+                                                 name='knut-scheduler',
+                                                 daemon=True)
+                self.__thread.start()
+
+            self.__condition.notify()
+
+    def cancel(self, key):
+        """Cancel the job of the *key*."""
+        with self.__condition:
+            self.__cancel(key)
+
+    def wake(self, key):
+        """Run the job of the *key* now instead of waiting until it is due.
+
+        If the job is currently run, it is not run again.
+        """
+        with self.__condition:
+            job = self.__jobs.get(key)
+
+            if job and key not in self.__running:
+                self.schedule(key, time.time(), job[3], job[4])
+
+    def __cancel(self, key):
+        job = self.__jobs.pop(key, None)
+
+        if job:
+            job[-1] = True
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    # drop all cancelled jobs from the top of the heap
+                    while self.__heap and self.__heap[0][-1]:
+                        heapq.heappop(self.__heap)
+
+                    now = time.time()
+
+                    if self.__heap and self.__heap[0][0] <= now:
+                        break
+
+                    timeout = self.RESYNC
+                    if self.__heap:
+                        timeout = min(timeout, self.__heap[0][0] - now)
+
+                    self.__condition.wait(timeout)
+
+                due = list()
+                while self.__heap and self.__heap[0][0] <= now:
+                    job = heapq.heappop(self.__heap)
+                    if job[-1]:
+                        continue
+
+                    if job[4] is None:
+                        del self.__jobs[job[2]]
+
+                    due.append(job)
+                    self.__running.add(job[2])
+
+            # pass the keys of all due jobs with the same callback at once
+            callbacks = dict()
+            for job in due:
+                callbacks.setdefault(job[3], list()).append(job)
+
+            for callback, jobs in callbacks.items():
+                threading.Thread(target=self.__call,
+                                 args=(callback, jobs),
+                                 name='knut-scheduler-job',
+                                 daemon=True).start()
+
+    def __call(self, callback, jobs):
+        """Call *callback* with the keys of the *jobs* and schedule the
+        repeated jobs again."""
+        try:
+            callback([job[2] for job in jobs])
+        except Exception:
+            logging.exception('Failed to run the scheduled %r.', callback)
+
+        with self.__condition:
+            now = time.time()
+
+            for job in jobs:
+                self.__running.discard(job[2])
+
+                # skip jobs which are not repeated or were cancelled or
+                # replaced by the callback
+                if job[4] is None or self.__jobs.get(job[2]) is not job:
+                    continue
+
+                # neither catch up on missed runs nor wait longer than the
+                # interval if the clock was stepped back
+                job[0] = min(max(job[0] + job[4], now), now + job[4])
+                job[1] = next(self.__counter)
+                heapq.heappush(self.__heap, job)
+
+            self.__condition.notify()
+
+
+scheduler = KnutScheduler()
+"""The scheduler which is shared by all services."""
@@ -15,9 +15,41 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
+import json
 import logging
 import signal
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps(obj) -> bytes:
+    """Return *obj* as UTF-8 encoded JSON bytes.
+
+    If installed, :mod:`orjson` is used to encode the *obj*. Otherwise, the
+    :mod:`json` module is used.
+    """
+    if orjson:
+        # be as permissive as json.dumps with keys and numpy scalars
+        return orjson.dumps(obj, option=(orjson.OPT_NON_STR_KEYS
+                                         | orjson.OPT_SERIALIZE_NUMPY))
+
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data):
+    """Return the object of the JSON *data*, which is either a string or UTF-8
+    encoded bytes or bytearray.
+
+    A :class:`json.JSONDecodeError` is raised if the *data* are invalid.
+    """
+    if orjson:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
 
 class KnutUtility():
     def __init__(self):
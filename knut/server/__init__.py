@@ -41,6 +41,7 @@ The following servers are provided by this module:
    :toctree: generated/
 
    tcpserver.KnutTCPServer
+   asyncserver.KnutAsyncTCPServer
    websocket.KnutWebSocket
 """
 
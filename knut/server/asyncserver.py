@@ -0,0 +1,197 @@
+# Copyright (C) 2020  Joe Pearson
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Provide a TCP server running on an asyncio event loop.
+"""
+
+import asyncio
+import logging
+import threading
+
+from knut.apis import KnutAPI
+from .knutserver import KnutServer
+from .tcpserver import KnutTCPRequestHandler, _set_socket_options
+
+
+class KnutAsyncTCPServer(KnutServer):
+    """Knut TCP server running on an asyncio event loop.
+
+    The server speaks the same protocol as the
+    :class:`~knut.server.tcpserver.KnutTCPServer`, where each message is an
+    UTF-8 encoded JSON message terminated by a null byte ``b'\\x00'``. But
+    instead of a thread per client, all clients are served by one event loop.
+    The requests are passed to the APIs in a thread of the loop's default
+    executor, since some back-ends block while e.g. switching a light.
+
+    Messages pushed by the APIs from any thread are send to all connected
+    clients, as well as a heartbeat with a frequency of
+    :const:`HEARTBEAT_FREQUENCY`.
+
+    The server is configured like the TCP server:
+
+    .. code-block:: yaml
+
+       server:
+         !knutobject
+           module: knut.server.asyncserver
+           class: KnutAsyncTCPServer
+           address: 127.0.0.1
+           port: 8080
+
+    """
+
+    HEARTBEAT_FREQUENCY = KnutTCPRequestHandler.HEARTBEAT_FREQUENCY
+    """The frequency in which the heartbeat is send measured in Hz."""
+
+    WRITE_LIMIT = 4*1024*1024
+    """The maximum number of bytes which are buffered to be send to a client.
+    If a client does not receive its messages fast enough and the limit is
+    exceeded, the client is disconnected."""
+
+    def __init__(self, address: str = "127.0.0.1", port: int = 8080) -> None:
+        """Bind the server to the *address* on the specified *port*."""
+        super(KnutAsyncTCPServer, self).__init__(address, port)
+
+        self.__loop = None
+        self.__loop_thread = None
+        self.__stop = None
+        self.__tasks = set()
+        self.__writers = set()
+
+    def add_api(self, api: KnutAPI) -> None:
+        """Adds a *api* to the server.
+
+        Messages pushed by the *api* are send to all connected clients. See
+        :meth:`push()`.
+        """
+        super(KnutAsyncTCPServer, self).add_api(api)
+        api.on_push += self.push
+
+    def push(self, apiid: int, msgid: int, msg: dict) -> None:
+        """Sends the *msg* of type *msgid* from the *apiid* to all clients.
+
+        This method can be called from any thread. The Knut message is build
+        once in the calling thread and then send from the event loop.
+        """
+        loop = self.__loop
+        if loop is None or loop.is_closed():
+            return
+
+        data = KnutTCPRequestHandler.msg_builder(
+            apiid, msgid, msg, KnutTCPRequestHandler.ENCODING)
+
+        if threading.get_ident() == self.__loop_thread:
+            self.__broadcast(data)
+        else:
+            loop.call_soon_threadsafe(self.__broadcast, data)
+
+    def knut_serve_forever(self) -> None:
+        """Run the event loop until :meth:`shutdown()` is called."""
+        asyncio.run(self.__serve())
+
+    def shutdown(self) -> None:
+        """Stop the server.
+
+        This method can be called from any thread.
+        """
+        loop = self.__loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.__stop.set)
+
+    async def __serve(self) -> None:
+        self.__stop = asyncio.Event()
+        self.__loop_thread = threading.get_ident()
+        self.__loop = asyncio.get_running_loop()
+
+        server = await asyncio.start_server(
+            self.__handle, self.address, self.port,
+            limit=KnutTCPRequestHandler.MAX_MSG_SIZE)
+        heartbeat = asyncio.ensure_future(self.__heartbeat())
+
+        try:
+            async with server:
+                await self.__stop.wait()
+        finally:
+            heartbeat.cancel()
+
+            # closing the connections lets the handlers return
+            for writer in self.__writers:
+                writer.close()
+
+            await asyncio.gather(*self.__tasks, return_exceptions=True)
+
+    async def __heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(1 / KnutAsyncTCPServer.HEARTBEAT_FREQUENCY)
+            self.__broadcast(b'\x00')
+
+    async def __handle(self, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> None:
+        client_address = writer.get_extra_info('peername')
+        _set_socket_options(writer.get_extra_info('socket'))
+        logging.info('Handle client request: %s', client_address)
+
+        self.__tasks.add(asyncio.current_task())
+        self.__writers.add(writer)
+        loop = asyncio.get_running_loop()
+
+        try:
+            while True:
+                try:
+                    data = await reader.readuntil(b'\x00')
+                except asyncio.IncompleteReadError:
+                    return  # no data available anymore
+                except asyncio.LimitOverrunError:
+                    logging.warning('Received message is too long: %s',
+                                    client_address)
+                    return
+                except ConnectionResetError as e:
+                    logging.info('Connection reset: %s', e)
+                    return
+
+                # handle the request in a thread since the APIs can block
+                response = await loop.run_in_executor(
+                    None, self.__handle_knutmsg, data[:-1])
+
+                if response and not writer.is_closing():
+                    writer.write(response)
+        finally:
+            self.__tasks.discard(asyncio.current_task())
+            self.__writers.discard(writer)
+            writer.close()
+            logging.debug('Close request handle: %s', client_address)
+
+    def __handle_knutmsg(self, data: bytes) -> bytes:
+        """Handles the Knut message *data* without the null byte and returns the
+        response as Knut message or None."""
+        apiid, msgid, msg = self.handle_knutmsg(data)
+
+        if msgid > 0:
+            return KnutTCPRequestHandler.msg_builder(
+                apiid, msgid, msg, KnutTCPRequestHandler.ENCODING)
+
+        return None
+
+    def __broadcast(self, data: bytes) -> None:
+        """Writes the *data* to all clients."""
+        for writer in tuple(self.__writers):
+            if writer.transport.get_write_buffer_size() > self.WRITE_LIMIT:
+                logging.warning('Disconnect client which does not receive its '
+                                'messages: %s',
+                                writer.get_extra_info('peername'))
+                self.__writers.discard(writer)
+                writer.close()
+            elif not writer.is_closing():
+                writer.write(data)
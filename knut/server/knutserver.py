@@ -12,9 +12,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from typing import Tuple
+import json
 import knut.apis
 import logging
 
+from knut.core.utility import json_loads
+
 
 class KnutServer():
     """Base class for Knut servers.
@@ -50,14 +54,70 @@ class KnutServer():
         """
         if all([hasattr(api, 'apiid'),
                 hasattr(api, 'on_push')]):
-            logging.debug('Add api to server: {}'.format(api))
+            logging.debug('Add api to server: %s', api)
         else:
             raise AttributeError('API is missing either a \'apiid\' or '
-                                 'an \'on_push\' event: {}'.format(api))
+                                 'an \'on_push\' event: %s' % api)
 
         apiid = api.apiid
         self.apis[apiid] = api
 
+    def handle_knutmsg(self, data: bytes) -> Tuple[int, int, dict]:
+        """Handles the Knut message *data* without the null byte.
+
+        The JSON message is decoded and its ``'msg'`` is passed to the API with
+        the ``'apiId'`` by :meth:`request_service()`. Returns a tuple of the
+        *apiid*, *msgid* and *msg* of the response. If there is no response,
+        e.g. since the message is invalid, the *msgid* is 0.
+        """
+        msg = dict()
+        msgid = 0x0000
+        apiid = 0x00
+
+        if not data:
+            return apiid, msgid, msg
+
+        logging.debug('Received raw message: %s', data)
+
+        try:
+            knutmsg = json_loads(data)
+        except json.decoder.JSONDecodeError:
+            logging.warning('Failed to decode JSON message...')
+            return apiid, msgid, msg
+
+        try:
+            apiid = knutmsg['apiId']
+            msgid = knutmsg['msgId']
+            msg = knutmsg['msg']
+
+            logging.debug('Message of type %s for API %s received...',
+                          msgid, apiid)
+
+            msgid, msg = self.request_service(apiid, msgid, msg)
+        except KeyError:
+            logging.warning('Received message is missing at least one of the '
+                            'following keys: [msgId, apiId, msg]')
+
+        return apiid, msgid, msg
+
+    def request_service(self,
+                        apiid: int,
+                        msgid: int,
+                        msg: dict) -> Tuple[int, dict]:
+        """Returns a service's response.
+
+        This method calls the ``request_handler()`` of the API with the
+        *apiid*. The API's request handler handles then the *msg* of
+        type *msgid*. The returned tuple holds the responses *msgid* and *msg*.
+        If no API for *apiid* is found in the servers API
+        dictionary, the *msg* and *msgid* is returned.
+        """
+        if apiid not in self.apis:
+            logging.warning('Unknown API request: %s', apiid)
+            return msgid, msg
+
+        return self.apis[apiid].request_handler(msgid, msg)
+
     def knut_serve_forever(self):
         """The main event loop of the server.
 
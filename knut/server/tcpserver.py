@@ -19,15 +19,37 @@
 """
 
 from typing import Tuple
-import json
+import collections
 import logging
-import queue
+import socket
 import socketserver
 import threading
+import time
 
 from knut.apis import KnutAPI
+from knut.core.utility import json_dumps
 from .knutserver import KnutServer
 
+# the maximum number of buffers send at once with sendmsg
+_IOV_MAX = 1024
+
+
+def _set_socket_options(sock):
+    """Set the options of a connected client socket *sock*.
+
+    Small messages are send immediately and dead clients are detected by TCP
+    keepalive probes after about a minute.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    # the probe times are only available on some platforms like Linux
+    for option, value in (('TCP_KEEPIDLE', 30),
+                          ('TCP_KEEPINTVL', 10),
+                          ('TCP_KEEPCNT', 3)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
 
 class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
     """Request handler for the :class:`KnutTCPServer`.
@@ -40,12 +62,27 @@ class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
     ENCODING = 'utf-8'
     """The encoding in which messages are received and send."""
 
+    BUFSIZE = 4096
+    """The maximum number of bytes received at once."""
+
+    MAX_MSG_SIZE = 1024*1024
+    """The maximum size of a received message in bytes. If a client sends a
+    longer message, it is disconnected."""
+
+    MAX_QUEUED = 1024
+    """The maximum number of messages queued for a client. If a client does not
+    receive its messages fast enough and the limit is exceeded, the client is
+    disconnected."""
+
     HEARTBEAT_FREQUENCY = 1
     """The frequency in which the heartbeat is send measured in Hz. See
     :meth:`heartbeat()` for more about the heartbeat."""
 
     def __init__(self, request, client_address, server):
-        self.__msg_queue = queue.Queue()
+        # appending and popping is atomic, the lock only serializes sending
+        self.__msg_queue = collections.deque()
+        self.__disconnected = False
+        self.__send_lock = threading.Lock()
 
         self.send_heartbeat = True
         """If true, :meth:`heartbeat()` is called with a frequency of
@@ -57,81 +94,79 @@ class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
 
     def finish(self) -> None:
         self.send_heartbeat = False
-        logging.debug('Close request handle: {}'.format(self.client_address))
+        self.server.remove_handler(self)
+        logging.debug('Close request handle: %s', self.client_address)
 
     def handle(self) -> None:
-        logging.info('Handle client request: {}'.format(self.client_address))
+        logging.info('Handle client request: %s', self.client_address)
 
-        while True:
-            data = b''
-            knutmsg = dict()
-            msg = dict()
-            msgid = 0x0000
-            apiid = 0x00
+        # the bytes are received into a buffer and only the bytes of a message
+        # which is not yet terminated by a null byte are collected in data
+        buffer = bytearray(KnutTCPRequestHandler.BUFSIZE)
+        view = memoryview(buffer)
+        data = bytearray()
 
+        while True:
             try:
-                # read until a null byte is received
-                while True:
-                    read_byte = self.request.recv(1)
-                    if read_byte == b'\x00':
-                        break
-                    elif not read_byte:
-                        return  # no data available anymore
-                    else:
-                        data += read_byte
-
-                logging.debug('Received bytes: {}'.format(len(data)))
-
-                if len(data) > 0:
-                    logging.debug('Received raw message: {}'.format(data))
-                    knutmsg = json.loads(
-                        data,
-                        encoding=KnutTCPRequestHandler.ENCODING
-                    )
-
-                    try:
-                        apiid = knutmsg['apiId']
-                        msgid = knutmsg['msgId']
-                        msg = knutmsg['msg']
-
-                        logging.debug('Message of type {} for API {} '
-                                      'received...'.format(msgid, apiid))
-
-                        msgid, msg = self.request_service(
-                            apiid, msgid, msg)
-                    except KeyError:
-                        logging.warning('Received message is missing at least '
-                                        'one of the following keys: '
-                                        '[msgId, apiId, msg]')
+                size = self.request.recv_into(buffer)
             except ConnectionResetError as e:
-                logging.info('Connection reset: {}'.format(e))
+                logging.info('Connection reset: %s', e)
+                return
+
+            if not size:
+                return  # no data available anymore
+
+            if data:
+                # complete the pending message with the received bytes
+                data += view[:size]
+                received, length = data, len(data)
+            else:
+                # handle the messages directly from the buffer
+                received, length = buffer, size
+
+            # handle all complete messages and keep the remaining bytes
+            begin = 0
+            end = received.find(b'\x00', 0, length)
+            while end >= 0:
+                # the slice is the only copy of the message and decoded as is
+                self.__handle_knutmsg(received[begin:end])
+                begin = end + 1
+                end = received.find(b'\x00', begin, length)
+
+            if received is data:
+                del data[:begin]
+            else:
+                data += view[begin:size]
+
+            if len(data) > KnutTCPRequestHandler.MAX_MSG_SIZE:
+                logging.warning('Received message is too long: %s',
+                                self.client_address)
                 return
-            except json.decoder.JSONDecodeError:
-                logging.warning('Failed to decode JSON message...')
 
-            if msgid > 0:
-                self.send_queued_knutmsg(apiid, msgid, msg)
+    def __handle_knutmsg(self, data: bytearray) -> None:
+        """Handles the Knut message *data* without the null byte."""
+        logging.debug('Received bytes: %s', len(data))
+
+        apiid, msgid, msg = self.server.handle_knutmsg(data)
+
+        if msgid > 0:
+            self.send_queued_knutmsg(apiid, msgid, msg)
 
     def heartbeat(self) -> None:
-        """Sends frequently a heartbeat.
+        """Sends a heartbeat.
 
         The heartbeat is a frequently send message, where only a null byte
-        ``b'\\x00'`` is send.
+        ``b'\\x00'`` is send. The server calls this method for all clients
+        with a frequency of :const:`HEARTBEAT_FREQUENCY`.
         """
         if self.send_heartbeat:
             self.send_queued(b'\x00')
-            timer = threading.Timer(
-                1 / KnutTCPRequestHandler.HEARTBEAT_FREQUENCY,
-                self.heartbeat
-            )
-            timer.daemon = True
-            timer.start()
-
-    def msg_builder(self,
-                    apiid: int,
+
+    @staticmethod
+    def msg_builder(apiid: int,
                     msgid: int,
                     msg: dict,
-                    encoding: str) -> bytearray:
+                    encoding: str) -> bytes:
         """Return a Knut message.
 
         Build a Knut message for the API *apiid* and the message *msg* of type
@@ -140,16 +175,15 @@ class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
         For example::
 
            >>> msg_builder(2, 2, {}, 'utf-8')
-           bytearray(b'{"apiid": 2, "msgId": 2, "msg": {}}\\x00')
+           b'{"apiId":2,"msgId":2,"msg":{}}\\x00'
 
+        The message is always UTF-8 encoded JSON and *encoding* is ignored.
         """
-        data = {'apiId': apiid, 'msgId': msgid, 'msg': msg}
-        data_str = json.dumps(data)
+        data = json_dumps({'apiId': apiid, 'msgId': msgid, 'msg': msg})
 
-        logging.debug('Build {} byte long message: {}'
-                      .format(len(data_str), data_str))
+        logging.debug('Build %s byte long message: %s', len(data), data)
 
-        return bytearray(data_str, encoding) + b'\x00'
+        return data + b'\x00'
 
     def request_service(self,
                         apiid: int,
@@ -157,17 +191,9 @@ class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
                         msg: dict) -> Tuple[int, dict]:
         """Returns a service's response.
 
-        This method calls the ``request_handler()`` of the API with the
-        *apiid*. The API's request handler handles then the *msg* of
-        type *msgid*. The returned tuple holds the responses *msgid* and *msg*.
-        If no API for *apiid* is found in the servers API
-        dictionary, the *msg* and *msgid* is returned.
+        See :meth:`knut.server.KnutServer.request_service`.
         """
-        if apiid not in self.server.apis.keys():
-            logging.warning('Unknown API request: {}'.format(apiid))
-            return msgid, msg
-
-        return self.server.apis[apiid].request_handler(msgid, msg)
+        return self.server.request_service(apiid, msgid, msg)
 
     def send_queued_knutmsg(self, apiid: int, msgid: int, msg: dict) -> None:
         """Sends a queued Knut message.
@@ -180,34 +206,96 @@ class KnutTCPRequestHandler(socketserver.BaseRequestHandler):
                                           msg,
                                           KnutTCPRequestHandler.ENCODING))
 
-    def send_queued(self, msg: bytearray) -> None:
+    def send_queued(self, msg: bytes) -> None:
         """Sends a queued message.
 
         Puts the *msg* to the message queue and sends all messages form the
-        queue until its empty.
+        queue until its empty. The messages are send at once by one thread, so
+        that the messages of several threads are not interleaved. If another
+        thread is already sending to the client, the *msg* is left to that
+        thread instead of waiting for it.
         """
-        self.__msg_queue.put(msg)
+        if self.__disconnected:
+            return
+
+        self.__msg_queue.append(msg)
 
-        while not self.__msg_queue.empty():
+        if len(self.__msg_queue) > KnutTCPRequestHandler.MAX_QUEUED:
+            if not self.__disconnected:
+                logging.warning('Disconnect client which does not receive its '
+                                'messages: %s', self.client_address)
+                self.__disconnect()
+            return
+
+        # the queue is checked again after releasing the lock, so that no
+        # message is left behind by a thread which did not get the lock
+        while self.__msg_queue and self.__send_lock.acquire(blocking=False):
+            try:
+                self.__send_pending()
+            finally:
+                self.__send_lock.release()
+
+    def __send_pending(self) -> None:
+        """Sends all messages from the queue."""
+        msgs = list()
+        while True:
             try:
-                # get next message from the queue
-                next_msg = self.__msg_queue.get_nowait()
+                msgs.append(self.__msg_queue.popleft())
+            except IndexError:
+                break
 
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            for next_msg in msgs:
                 # don't log heartbeats
                 if next_msg != b'\x00':
-                    logging.debug('Send message from queue to client {}: {}'
-                                  .format(self.client_address, next_msg))
+                    logging.debug('Send message from queue to client '
+                                  '%s: %s', self.client_address, next_msg)
+
+        try:
+            self.__sendall(msgs)
+        except OSError as e:
+            logging.info('Failed to send to client %s: %s',
+                         self.client_address, e)
+            self.__disconnect()
+
+    def __disconnect(self) -> None:
+        """Stops sending to the client and shuts the connection down, so that
+        :meth:`handle()` returns."""
+        self.__disconnected = True
+        self.__msg_queue.clear()
+        self.send_heartbeat = False
+        self.server.remove_handler(self)
 
-                self.request.sendall(next_msg)
-            except (BrokenPipeError, OSError):
-                return
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # already disconnected
+
+    def __sendall(self, msgs: list) -> None:
+        """Sends all *msgs* with as few system calls as possible."""
+        if not hasattr(self.request, 'sendmsg'):
+            self.request.sendall(b''.join(msgs))
+            return
+
+        # send the messages as scatter-gather array and drop the send bytes
+        # until all messages are send
+        buffers = [memoryview(msg) for msg in msgs]
+        while buffers:
+            sent = self.request.sendmsg(buffers[:_IOV_MAX])
+
+            while buffers and sent >= len(buffers[0]):
+                sent -= len(buffers.pop(0))
+
+            if sent:
+                buffers[0] = buffers[0][sent:]
 
     def setup(self) -> None:
-        logging.debug('Start heartbeat: {}'.format(self.client_address))
-        threading.Thread(target=self.heartbeat, daemon=True).start()
+        _set_socket_options(self.request)
 
-        for apiid, service in self.server.apis.items():
-            service.on_push += self.send_queued_knutmsg
+        # the server pushes the messages of the APIs and the heartbeat to all
+        # its handlers
+        logging.debug('Start heartbeat: %s', self.client_address)
+        self.server.add_handler(self)
 
 
 class KnutTCPServer(socketserver.ThreadingMixIn,
@@ -246,7 +334,7 @@ class KnutTCPServer(socketserver.ThreadingMixIn,
        temperature = Temperature()
        temperature.add_backend(DummyTemperature('Somewhere', 'dummy'))
 
-       server = KnutTCPServer(("localhost", 8080))
+       server = KnutTCPServer('localhost', 8080)
        server.add_api(temperature)
 
        with server:
@@ -269,18 +357,108 @@ class KnutTCPServer(socketserver.ThreadingMixIn,
     :const:`TEMPERATURE_LIST_RESPONSE`.
     """
 
+    daemon_threads = True
+    """The threads of the clients are daemonic. They are neither tracked nor
+    joined when the server is closed, since the clients stay connected."""
+
+    MAX_CLIENTS = 64
+    """The maximum number of connected clients. Since each client is served by
+    its own thread, further connections are closed right away."""
+
     def __init__(self, address: str = "127.0.0.1", port: int = 8080) -> None:
         """Bind the server to the *address* on the specified *port*."""
         self.allow_reuse_address = True
 
-        self.apis = dict()
+        # TCPServer does not call the __init__ of the other base classes
+        KnutServer.__init__(self, address, port)
+
+        self.handlers = frozenset()
+        """The request handlers of all connected clients.
+
+        The set is replaced when a client connects or disconnects, so that it
+        can be iterated without a copy.
+        """
+
+        self.__lock = threading.Lock()
+        self.__heartbeat_thread = None
+        self.__clients = threading.BoundedSemaphore(KnutTCPServer.MAX_CLIENTS)
 
         super(KnutTCPServer, self).__init__((address, port),
                                             KnutTCPRequestHandler)
 
+    def add_api(self, api: KnutAPI) -> None:
+        """Adds a *api* to the server.
+
+        Messages pushed by the *api* are send to all connected clients. See
+        :meth:`push()`.
+        """
+        super(KnutTCPServer, self).add_api(api)
+        api.on_push += self.push
+
+    def process_request(self, request, client_address) -> None:
+        if not self.__clients.acquire(blocking=False):
+            logging.warning('Reject client, too many connections: %s',
+                            client_address)
+            self.shutdown_request(request)
+            return
+
+        try:
+            super(KnutTCPServer, self).process_request(request,
+                                                       client_address)
+        except BaseException:
+            self.__clients.release()
+            raise
+
+    def process_request_thread(self, request, client_address) -> None:
+        try:
+            super(KnutTCPServer, self).process_request_thread(request,
+                                                              client_address)
+        finally:
+            self.__clients.release()
+
+    def add_handler(self, handler: KnutTCPRequestHandler) -> None:
+        """Adds the request *handler* of a connected client to the
+        :attr:`handlers`.
+
+        One thread sends the heartbeat to all handlers. It is started with
+        the first handler.
+        """
+        with self.__lock:
+            self.handlers = self.handlers | {handler}
+
+            if not self.__heartbeat_thread:
+                self.__heartbeat_thread = threading.Thread(
+                    target=self.__heartbeat, name='tcp-heartbeat', daemon=True)
+                self.__heartbeat_thread.start()
+
+    def remove_handler(self, handler: KnutTCPRequestHandler) -> None:
+        """Removes the request *handler* from the :attr:`handlers`."""
+        with self.__lock:
+            self.handlers = self.handlers - {handler}
+
+    def push(self, apiid: int, msgid: int, msg: dict) -> None:
+        """Sends the *msg* of type *msgid* from the *apiid* to all clients.
+
+        The Knut message is only build once and then send by the request
+        handler of each client.
+        """
+        data = self.RequestHandlerClass.msg_builder(
+            apiid, msgid, msg, self.RequestHandlerClass.ENCODING)
+
+        for handler in self.handlers:
+            handler.send_queued(data)
+
+    def __heartbeat(self):
+        period = 1 / self.RequestHandlerClass.HEARTBEAT_FREQUENCY
+
+        while True:
+            time.sleep(period)
+
+            for handler in self.handlers:
+                handler.heartbeat()
+
     def knut_serve_forever(self):
+        """Serve in the calling thread until :meth:`shutdown()` is called from
+        another thread or the serving is interrupted."""
         with self:
-            server_thread = threading.Thread(target=self.serve_forever)
-            server_thread.daemon = True
-            server_thread.start()
-            server_thread.join()
+            self.serve_forever()
@@ -13,13 +13,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Tuple
 import asyncio
-import json
 import logging
 
 import websockets
 
+from knut.core.utility import json_dumps
 from .knutserver import KnutServer
 import knut.apis
 
@@ -29,57 +28,18 @@ class KnutWebSocket(KnutServer):
 
     async def request_handler(self, websocket, path):
         while True:
-            msg = dict()
-            msgid = 0
-            apiid = 0
-
             try:
                 data = await websocket.recv()
-
-                if len(data) > 0:
-                    knutmsg = json.loads(data)
-
-                    try:
-                        apiid = knutmsg['apiId']
-                        msgid = knutmsg['msgId']
-                        msg = knutmsg['msg']
-
-                        logging.debug('Message of type {} for API {} '
-                                      'received...'.format(msgid, apiid))
-
-                        msgid, msg = self.request_service(apiid, msgid, msg)
-                    except KeyError:
-                        logging.warning('Received message is missing at least '
-                                        'one of the following keys: '
-                                        '[msgId, apiId, msg]')
-
-            except json.decoder.JSONDecodeError:
-                logging.warning('Failed to decode JSON message...')
             except websockets.exceptions.ConnectionClosedError:
                 logging.debug('Connection unexpected closed.')
                 return
 
+            apiid, msgid, msg = self.handle_knutmsg(data)
+
             if msgid > 0:
                 data = {'apiId': apiid, 'msgId': msgid, 'msg': msg}
-                await websocket.send(json.dumps(data))
-
-    def request_service(self,
-                        apiid: int,
-                        msgid: int,
-                        msg: dict) -> Tuple[int, dict]:
-        """Return a service's response.
-
-        Call the ``request_handler()`` of the API with the *apiid*. The API's
-        request handler handles then the *msg* of type *msgid*. Return a tuple
-        that holds the responses *msgid* and *msg*. If no API for *apiid* is
-        found in the servers API dictionary, the *msg* and *msgid* is returned.
-        """
-
-        if apiid not in self.apis.keys():
-            logging.warning('Unknown API request: {}'.format(apiid))
-            return msgid, msg
-
-        return self.apis[apiid].request_handler(msgid, msg)
+                # send a text frame like before
+                await websocket.send(json_dumps(data).decode('utf-8'))
 
     def knut_serve_forever(self):
         server = websockets.serve(self.request_handler,
@@ -14,11 +14,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from events import Events
 import logging
+import threading
 
 
 class Light(Events):
     """Base class for light services."""
 
+    STATUS_KEYS = ('color', 'color_cold', 'color_warm', 'dimlevel', 'has_color',
+                   'has_dimlevel', 'has_temperature', 'location', 'room',
+                   'state', 'temperature', 'uid')
+    """The attributes from which the :meth:`status()` dictionary is created."""
+
     def __init__(self, location, uid, room):
         """The light has an *uid* and *location* within a *room*.
 
@@ -28,6 +34,10 @@ class Light(Events):
         event.
 
         """
+        self.__status = None  # the cached status dictionary
+        self.__status_lock = threading.Lock()
+        self.__status_version = 0  # counts the changes of the status
+
         self.has_color = bool()
         self.has_dimlevel = bool()
         self.has_temperature = bool()
@@ -60,8 +70,28 @@ class Light(Events):
         # listening methods.
         self.__events__ = ('on_change')
 
+    def __setattr__(self, name, value):
+        super(Light, self).__setattr__(name, value)
+
+        # invalidate the cached status dictionary after any of its values is
+        # changed
+        if name in Light.STATUS_KEYS:
+            with self.__status_lock:
+                self.__status_version += 1
+                self.__status = None
+
     def status(self):
-        return {
+        """Return the status of the light as dictionary.
+
+        The dictionary is cached until any of the :const:`STATUS_KEYS`
+        attributes changes and must therefore not be modified.
+        """
+        status = self.__status
+        if status is not None:
+            return status
+
+        version = self.__status_version
+        status = {
             'id': self.uid,
             'location': self.location,
             'room': self.room,
@@ -69,13 +99,21 @@ class Light(Events):
             'hasTemperature': self.has_temperature,
             'hasDimlevel': self.has_dimlevel,
             'hasColor': self.has_color,
-            'temperature': int(self.temperature) if self.has_temperature else None,
+            'temperature': (int(self.temperature)
+                            if self.has_temperature else None),
             'colorCold': self.color_cold if self.has_temperature else None,
             'colorWarm': self.color_warm if self.has_temperature else None,
             'dimlevel': int(self.dimlevel) if self.has_dimlevel else None,
             'color': self.color if self.has_color else None
         }
 
+        # don't cache the status if it changed while it was created
+        with self.__status_lock:
+            if version == self.__status_version:
+                self.__status = status
+
+        return status
+
     def status_setter(self, status):
         """Applies the *status* to the back-end.
 
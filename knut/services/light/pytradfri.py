@@ -25,6 +25,63 @@ from pytradfri.api.libcoap_api import APIFactory
 
 from .light import Light
 
+# the factors to convert a dim level between the range [0, 254] of a TRÅDFRI
+# light and the range [0, 100]
+_HEX_TO_PERCENT = 100/254
+_PERCENT_TO_HEX = 254/100
+
+
+class _DeviceUpdater():
+    """Update the TRÅDFRI devices from one background thread.
+
+    A light's device is updated to the latest state of its back-end. So the
+    updates requested while one is pending, e.g. by moving a slider, are
+    merged into one.
+    """
+
+    DELAY = 0.05
+    """The time in seconds to wait for further updates before updating."""
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__pending = dict()  # the lights to update by their id
+        self.__thread = None
+
+    def submit(self, light):
+        """Update the device of the *light* in the background."""
+        with self.__condition:
+            self.__pending[id(light)] = light
+
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run,
+                                                 name='tradfri-updater',
+                                                 daemon=True)
+                self.__thread.start()
+
+            self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__pending:
+                    self.__condition.wait()
+
+            time.sleep(_DeviceUpdater.DELAY)
+
+            with self.__condition:
+                lights = list(self.__pending.values())
+                self.__pending.clear()
+
+            for light in lights:
+                try:
+                    light.update_device()
+                except Exception:
+                    logging.exception('Failed to update TRADFRI device '
+                                      '\'%s\'.', light.uid)
+
+
+_updater = _DeviceUpdater()
+
 
 class PyTradfriLight(Light):
     """A TRÅDFRI light service.
@@ -34,6 +91,20 @@ class PyTradfriLight(Light):
     control an IKEA TRÅDFRI light.
     """
 
+    OBSERVATION_DURATION = 90
+    """The duration in seconds of one observation of the light."""
+
+    MAX_OBSERVATION_DELAY = 60
+    """The maximum delay in seconds before a failed observation is restarted.
+    """
+
+    UPDATE_RETRIES = 3
+    """How often updating the device is retried after a request timeout."""
+
+    UPDATE_RETRY_DELAY = 0.5
+    """The delay in seconds before the first retry of an update. The delay
+    doubles with each further retry."""
+
     def __init__(self, location, uid, room, device_id, host, psk_id, psk):
         """Connect to a TRÅDFRI light with it's the *device_id*. To connect to the
         TRÅDFRI gateway with the known *host* address, a pre-shared key *psk*
@@ -81,15 +152,18 @@ class PyTradfriLight(Light):
         self.device = None
         gateway = Gateway()
 
+        # the last observed (state, dimmer, color_temp) of the device
+        self._last_snapshot = None
+
         while not self.device:
-            logging.debug('Try to get device \'%s\'...' % uid)
+            logging.debug('Try to get device \'%s\'...', uid)
             try:
                 self.device = self.api(gateway.get_device(self.device_id))
             except pytradfri.error.RequestTimeout:
                 pass
             except FileNotFoundError:
-                logging.critical('Failed to load pytradfri service \'%s\'.'
-                                 % self.uid)
+                logging.critical('Failed to load pytradfri service \'%s\'.',
+                                 self.uid)
                 return
 
         # get device information
@@ -104,13 +178,21 @@ class PyTradfriLight(Light):
             self.has_dimlevel = True
             # convert from range [0, 254] to [0, 100]
             dimlevel_hex = self.device.light_control.lights[0].dimmer
-            self.dimlevel = round(dimlevel_hex/254*100, 0)
+            self.dimlevel = round(dimlevel_hex*_HEX_TO_PERCENT, 0)
             self.saved_dimlevel = self.dimlevel if self.dimlevel > 0 else 1
         else:
             self.has_dimlevel = False
 
         if self.device.light_control.can_set_temp:
             self.has_temperature = True
+
+            # the mired range of the light does not change
+            light_control = self.device.light_control
+            diff_mireds = light_control.max_mireds - light_control.min_mireds
+            self._min_mireds = light_control.min_mireds
+            self._mireds_per_percent = diff_mireds/100
+            self._percent_per_mired = 100/diff_mireds
+
             # get the temperature in mired and convert to range [0, 100]
             temperature_mired = self.device.light_control.lights[0].color_temp
             self.temperature = self.mired_to_precent(temperature_mired)
@@ -122,7 +204,7 @@ class PyTradfriLight(Light):
                                               name='%s-thread' % uid)
         observation_thread.daemon = True
         observation_thread.start()
-        logging.info('Initialized TRADFRI device \'%s\'.' % self.uid)
+        logging.info('Initialized TRADFRI device \'%s\'.', self.uid)
 
     def percent_to_mired(self, value):
         """Return the mired value of *value*.
@@ -134,9 +216,7 @@ class PyTradfriLight(Light):
             raise AttributeError('Light \'%s\' has no temperature'
                                  % self.uid)
 
-        diff = (self.device.light_control.max_mireds
-                - self.device.light_control.min_mireds)
-        value_mired = self.device.light_control.min_mireds + diff*value/100
+        value_mired = self._min_mireds + value*self._mireds_per_percent
         return int(round(value_mired, 0))
 
     def mired_to_precent(self, value):
@@ -149,70 +229,94 @@ class PyTradfriLight(Light):
             raise AttributeError('Light \'%s\' has no temperature'
                                  % self.uid)
 
-        diff = (self.device.light_control.max_mireds
-                - self.device.light_control.min_mireds)
-        percent = (value - self.device.light_control.min_mireds)/diff*100
+        percent = (value - self._min_mireds)*self._percent_per_mired
         return int(round(percent, 0))
 
     def status_setter(self, status):
+        """Set the back-end's *status* and update the device in the background.
+        """
         super(PyTradfriLight, self).status_setter(status)
-        self.update_device()
+
+        # the back-end no longer matches the last observed device state, so
+        # the next observation must update it, e.g. if the update fails
+        self._last_snapshot = None
+        _updater.submit(self)
 
     def update_device(self):
-        """Update the TRÅDFRI device to the back-end."""
-        try:
-            self.api(self.device.update())
-            device_state = self.device.light_control.lights[0]
-            light_control = self.device.light_control
+        """Update the TRÅDFRI device to the back-end.
 
-            if device_state.state != self.state:
-                self.api(light_control.set_state(self.state))
+        If the gateway does not respond, the update is tried again up to
+        :const:`UPDATE_RETRIES` times after a delay which starts at
+        :const:`UPDATE_RETRY_DELAY` seconds.
+        """
+        delay = PyTradfriLight.UPDATE_RETRY_DELAY
+
+        for attempt in range(PyTradfriLight.UPDATE_RETRIES + 1):
+            if attempt:
+                time.sleep(delay)
+                delay *= 2
+
+            try:
+                self.api(self.device.update())
+                light_control = self.device.light_control
+                device_state = light_control.lights[0]
+
+                if device_state.state != self.state:
+                    self.api(light_control.set_state(self.state))
 
-            if self.has_dimlevel:
-                dimlevel_hex = int(254*self.dimlevel/100)
-                if device_state.dimmer != dimlevel_hex:
-                    self.api(light_control.set_dimmer(dimlevel_hex))
+                if self.has_dimlevel:
+                    dimlevel_hex = int(self.dimlevel*_PERCENT_TO_HEX)
+                    if device_state.dimmer != dimlevel_hex:
+                        self.api(light_control.set_dimmer(dimlevel_hex))
 
-            if self.has_temperature:
-                temperature_mired = self.percent_to_mired(self.temperature)
-                if (device_state.color_temp != temperature_mired):
-                    self.api(light_control.set_color_temp(temperature_mired))
-        except pytradfri.error.RequestTimeout:
-            logging.error('\'%s\' has a request timeout.' % self.uid)
-            self.update_device()
+                if self.has_temperature:
+                    temperature_mired = self.percent_to_mired(self.temperature)
+                    if (device_state.color_temp != temperature_mired):
+                        self.api(
+                            light_control.set_color_temp(temperature_mired))
+
+                return
+            except pytradfri.error.RequestTimeout:
+                logging.error('\'%s\' has a request timeout.', self.uid)
+
+        logging.error('Failed to update TRADFRI device \'%s\'.', self.uid)
 
     def observation(self):
         """Observe the TRÅDFRI light.
 
-        If the observed light changes, :meth:`update_backend` is called.
+        If the observed light changes, :meth:`update_backend` is called. An
+        observation which ends early, e.g. since the gateway is not reachable,
+        is restarted after a delay which doubles up to
+        :const:`MAX_OBSERVATION_DELAY` seconds.
         """
-        thread = None
+        delay = 1
 
         def err_callback(err):
-            logging.error('Error in TRADFRI observation \'%s\'.'
-                          % self.uid)
+            logging.error('Error in TRADFRI observation \'%s\'.',
+                          self.uid)
 
         while True:
-            # check if the observation is alive and restart it if not
-            if thread and not thread.is_alive():
-                logging.debug('Observation of \'%s\' terminated.'
-                              % self.uid)
-                thread = None
-
-            if not thread:
-                thread = threading.Thread(
-                    target=self.api,
-                    name='%s-observation' % self.uid,
-                    args=(self.device.observe(self.update_backend,
-                                              err_callback,
-                                              duration=90),)
-                )
-                thread.daemon = True
-                thread.start()
-                logging.debug('Started observation of \'%s\'.'
-                              % self.uid)
-
-            time.sleep(1)
+            started = time.monotonic()
+            logging.debug('Started observation of \'%s\'.', self.uid)
+
+            # the observation blocks until its duration is over
+            try:
+                self.api(self.device.observe(
+                    self.update_backend,
+                    err_callback,
+                    duration=PyTradfriLight.OBSERVATION_DURATION))
+            except Exception as e:
+                logging.error('TRADFRI observation \'%s\' failed: %s',
+                              self.uid, e)
+
+            logging.debug('Observation of \'%s\' terminated.', self.uid)
+
+            if (time.monotonic() - started
+                    < PyTradfriLight.OBSERVATION_DURATION):
+                time.sleep(delay)
+                delay = min(2*delay, PyTradfriLight.MAX_OBSERVATION_DELAY)
+            else:
+                delay = 1
 
     def update_backend(self, device):
         """Update the back-end to the *device* state.
@@ -223,12 +327,22 @@ class PyTradfriLight(Light):
         if device.id != self.device_id:
             return
 
+        device_state = device.light_control.lights[0]
+
+        # the observation fires on any attribute update, so skip the
+        # notification if the relevant light state did not change
+        snapshot = (device_state.state,
+                    device_state.dimmer,
+                    device_state.color_temp)
+
+        if snapshot == self._last_snapshot:
+            return
+
         lock = threading.Lock()
         lock.acquire()
 
-        logging.debug('Update light \'%s\' in the back-end.'
-                      % self.uid)
-        device_state = device.light_control.lights[0]
+        logging.debug('Update light \'%s\' in the back-end.',
+                      self.uid)
 
         # apply new states to back-end
         self.state = device_state.state
@@ -236,7 +350,7 @@ class PyTradfriLight(Light):
         if self.has_dimlevel:
             # a TRÅDFRI light can be switch off while having a dim level greater
             # zero
-            dimlevel = round(device_state.dimmer/254*100, 0)
+            dimlevel = round(device_state.dimmer*_HEX_TO_PERCENT, 0)
             self.dimlevel = dimlevel if self.state else 0
 
             if dimlevel > 0:
@@ -245,6 +359,7 @@ class PyTradfriLight(Light):
         if self.has_temperature:
             self.temperature = self.mired_to_precent(device_state.color_temp)
 
+        self._last_snapshot = snapshot
         lock.release()
 
         # TODO: add color handling
@@ -15,12 +15,53 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import atexit
 import logging
+import threading
 
 import rpi_rf
 
 from .light import Light
 
+# the enabled transmitters by their GPIO, which are shared by all lights
+_transmitters = dict()
+_lock = threading.Lock()
+
+
+def _transmit(gpio, code):
+    """Send the *code* with the transmitter at the *gpio*.
+
+    The transmitter is enabled once and kept enabled until exit. Codes are
+    send one after another, since the lights may share a transmitter.
+    """
+    with _lock:
+        device = _transmitters.get(gpio)
+
+        if device is None:
+            logging.debug('Enable TX at GPIO %s...', gpio)
+            device = rpi_rf.RFDevice(gpio)
+
+            if not device.enable_tx():
+                logging.error('Failed to enable TX at GPIO %s', gpio)
+                device.cleanup()
+                return
+
+            if not _transmitters:
+                atexit.register(_cleanup)
+
+            _transmitters[gpio] = device
+
+        device.tx_code(code)
+
+
+def _cleanup():
+    """Disable all transmitters."""
+    with _lock:
+        for device in _transmitters.values():
+            device.cleanup()
+
+        _transmitters.clear()
+
 
 class RFLight(Light):
     """A RF 433 mHz light service.
@@ -47,20 +88,9 @@ class RFLight(Light):
         Extend the base class method to send a code depending on the ``'state'``
         key of the status dict.
         """
-        logging.debug('Enable TX for device \'%s\'...' % self.uid)
-        device = rpi_rf.RFDevice(self._gpio)
-        enabled = device.enable_tx()
-
-        if not enabled:
-            logging.error('Failed to enable TX for \'%s\''
-                          % self.uid)
-
         if status['state']:
-            device.tx_code(self._code_on)
-        elif not status['state']:
-            device.tx_code(self._code_off)
-
-        device.cleanup()
-        del(device)
+            _transmit(self._gpio, self._code_on)
+        else:
+            _transmit(self._gpio, self._code_off)
 
         super(RFLight, self).status_setter(status)
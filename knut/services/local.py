@@ -16,17 +16,16 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-import numpy
-import threading
 import time
-import urllib
+import weakref
 
-from astroplan import download_IERS_A
 from astroplan import Observer
 from astropy.time import Time
 from events import Events
 import astropy
 
+from knut.core.scheduler import scheduler
+
 
 class Local(Events):
     """Provide local data like sunrise and sunset times.
@@ -37,6 +36,12 @@ class Local(Events):
     notification to listening objects.
     """
 
+    RETRY = 60
+    """The time in seconds after which a failed refresh of the sun rise and
+    set is retried."""
+
+    _instances = weakref.WeakSet()
+
     def __init__(self, location=None, uid='local',
                  latitude=0, longitude=0, elevation=0):
         """Calculate the location data for the *location* based on the *latitude*,
@@ -73,7 +78,7 @@ class Local(Events):
         self.uid = uid
         """The identifier of the location service."""
 
-        self.__daylight_timer = None  # used to update is_daylight
+        Local._instances.add(self)
 
         self.update_observer()
 
@@ -100,6 +105,36 @@ class Local(Events):
                 'sunset': self.sunset,
                 'id': self.uid}
 
+    @classmethod
+    def refresh_all(cls, services=None):
+        """Update the sun rise and set times of the *services*.
+
+        If no *services* are passed, all :class:`Local` services are updated.
+        The :class:`astropy.time.Time` used to get the next sun rise and set is
+        created once and shared by all services. This method is called by the
+        daylight alarm with all services whose alarms are due at once. If the
+        refresh of a service fails, it is retried after :const:`RETRY` seconds.
+        """
+        if services is None:
+            services = list(cls._instances)
+
+        astro_time = None
+
+        for service in services:
+            logging.debug('Refresh sun rise and set for \'%s\'...',
+                          service.uid)
+            try:
+                if astro_time is None:
+                    astro_time = cls.__astro_time()
+
+                service.__get_sun_rise_and_set(astro_time)
+                service.__update_daylight()
+                service.__set_daylight_timer()
+            except Exception:
+                logging.exception('Failed to refresh sun rise and set for '
+                                  '\'%s\'.', service.uid)
+                service.__set_daylight_timer(time.time() + cls.RETRY)
+
     def update_observer(self):
         """Update the :attr:`observer` and :attr:`sunset` time.
 
@@ -107,7 +142,7 @@ class Local(Events):
         :attr:`elevation`, the :attr:`observer` should be updated using this
         method. This also updates the :attr:`sunset` time.
         """
-        logging.debug('Update observer for \'%s\'...' % self.uid)
+        logging.debug('Update observer for \'%s\'...', self.uid)
         self.observer = Observer(longitude=self.longitude*astropy.units.deg,
                                  latitude=self.latitude*astropy.units.deg,
                                  elevation=self.elevation*astropy.units.m)
@@ -115,53 +150,64 @@ class Local(Events):
         self.__set_daylight_timer()
         self.__update_daylight()
 
-    def __get_sun_rise_and_set(self):
-        """Get the next sun rise and set time."""
+    @staticmethod
+    def __astro_time():
+        """Return the times for which the next sun rise and set are computed."""
         # Try to get for now and in one hour the next sun rise and set. In
         # spring the next sun set can takes more than on day when trying to get
         # the next sun set when currently the sun is setting. This would lead to
         # an NaN value and therefore the second check in one hour needs to be
         # done.
-        astro_time = Time([time.time(), time.time() + 3600], format='unix')
+        now = time.time()
+        return Time([now, now + 3600], format='unix')
+
+    def __get_sun_rise_and_set(self, astro_time=None):
+        """Get the next sun rise and set time.
+
+        The sun rise and set are computed for the *astro_time* or, if not
+        provided, for the current time.
+        """
+        if astro_time is None:
+            astro_time = Local.__astro_time()
+
         sun_rise_time = self.observer.sun_rise_time(astro_time, 'next')
         sun_set_time = self.observer.sun_set_time(astro_time, 'next')
 
         self.sunrise = sun_rise_time.min().unix
         self.sunset = sun_set_time.min().unix
 
-        logging.debug('Next sun rise is at %f and the next sun set at %f...'
-                      % (self.sunrise, self.sunset))
+        logging.debug('Next sun rise is at %f and the next sun set at %f...',
+                      self.sunrise, self.sunset)
 
-    def __set_daylight_timer(self):
-        """Set a timer to update :attr:`is_daylight`.
+    def __set_daylight_timer(self, alarm=None):
+        """Set an alarm to update :attr:`is_daylight`.
 
-        The timer resets itself as soon as it is triggered and updates the
+        The alarm is set to the *alarm* in seconds since the epoch or, if not
+        provided, to the next sun rise or set. It calls :meth:`refresh_all()`
+        which resets the alarm as soon as it is triggered and updates the
         :attr:`is_daylight`.
         """
-        def update_alarm():
-            logging.debug('Update alarm for \'%s\' triggered...'
-                          % self.uid)
-            self.__get_sun_rise_and_set()
-            self.__update_daylight()
-            self.__set_daylight_timer()
-
-        if self.__daylight_timer:
-            self.__daylight_timer.cancel()
-
-        # the time in seconds until the next sun rise or set
-        if self.sunset < self.sunrise and time.time() < self.sunset:
-            # we have currently daylight and set the timer to the sun set
-            time_from_now = int(round(self.sunset - time.time(), 0))
-        else:
-            time_from_now = int(round(self.sunrise - time.time(), 0))
-
-        logging.debug('Set a timer for the next sun rise or set at \'%s\' which '
-                      'is due in %i seconds...'
-                      % (self.uid, time_from_now))
-
-        self.__daylight_timer = threading.Timer(time_from_now, update_alarm)
-        self.__daylight_timer.daemon = True
-        self.__daylight_timer.start()
+        if alarm is None:
+            # the time in seconds since the epoch of the next sun rise or set
+            if self.sunset < self.sunrise and time.time() < self.sunset:
+                # we have currently daylight and set the alarm to the sun set
+                alarm = self.sunset
+            else:
+                alarm = self.sunrise
+
+        logging.debug('Set an alarm for the next sun rise or set at \'%s\' '
+                      'which is due in %i seconds...',
+                      self.uid, int(round(alarm - time.time(), 0)))
+
+        # the service is referenced weakly, so that its alarm does not keep it
+        # alive
+        scheduler.schedule(weakref.ref(self), alarm, Local.__daylight_alarm)
+
+    @classmethod
+    def __daylight_alarm(cls, refs):
+        """Refresh the services of the weak *refs* which are still alive."""
+        cls.refresh_all([service for service in (ref() for ref in refs)
+                         if service is not None])
 
     def __update_daylight(self):
         """Update the :attr:`is_daylight` attribute."""
@@ -170,7 +216,7 @@ class Local(Events):
         is_daylight = self.sunset < self.sunrise and time.time() < self.sunset
 
         if is_daylight != self.is_daylight:
-            logging.info('Day light changed for location \'%s\''
-                          % self.location)
+            logging.info('Day light changed for location \'%s\'',
+                          self.location)
             self.is_daylight = is_daylight
             self.on_change(self.local())
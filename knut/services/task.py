@@ -15,16 +15,92 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import json
+import atexit
 import logging
 import os
-import signal
+import queue
 import threading
 import time
 import uuid
 
 from events import Events
 
+from knut.core.scheduler import scheduler
+from knut.core.utility import json_dumps
+
+
+class _TaskWriter():
+    """Write the task files from one background thread.
+
+    Files are written in the order they are queued, but if a file is queued
+    several times before the writer gets to it, only the latest data is
+    written. Each file is first written to a temporary file which then
+    atomically replaces the task file.
+    """
+
+    def __init__(self):
+        self.__queue = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+    def write(self, path, data):
+        """Write the *data* bytes to the file *path*.
+
+        If *data* is None, the file is removed instead.
+        """
+        with self.__lock:
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run,
+                                                 name='task-writer',
+                                                 daemon=True)
+                self.__thread.start()
+                atexit.register(self.flush)
+
+        self.__queue.put((path, data))
+
+    def flush(self):
+        """Block until all queued files are written."""
+        self.__queue.join()
+
+    def __run(self):
+        while True:
+            pending = dict()
+            path, data = self.__queue.get()
+            pending[path] = data
+            count = 1
+
+            # drain the queue and keep only the latest data of each file
+            while True:
+                try:
+                    path, data = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                pending[path] = data
+                count += 1
+
+            for path, data in pending.items():
+                try:
+                    if data is None:
+                        os.remove(path)
+                    else:
+                        tmp = path + '.tmp'
+                        with open(tmp, 'wb') as f:
+                            f.write(data)
+                        os.replace(tmp, path)
+                except OSError as e:
+                    logging.error('Failed to write task file \'%s\': %s',
+                                  path, e)
+
+            for _ in range(count):
+                self.__queue.task_done()
+
+
+_writer = _TaskWriter()
+
+# the task directories which are known to exist
+_task_dirs = set()
+
 
 class Task(Events):
     """Create and manipulate a task.
@@ -35,10 +111,18 @@ class Task(Events):
     event can react upon the notification and send e.g. a reminder to clients.
     """
 
+    KEYS = ('assignee', 'author', 'description', 'done', 'due', 'reminder',
+            'title')
+    """The keys of a task dictionary which are updated by :meth:`update_task()`.
+    """
+
     def __init__(self, uid=None, task_dir=None):
         """Create a task with the *uid* and save it in the *task_dir*. If the uid is
         None, a new unique identifier is assigned to the task.
         """
+        self.__task = None  # the cached task dictionary
+        self.__task_lock = threading.Lock()
+        self.__task_version = 0  # counts the changes of the task
 
         self.uid = uid
         """The unique identifier of the task."""
@@ -72,54 +156,48 @@ class Task(Events):
         if not self.uid:
             self.uid = str(uuid.uuid1())
 
-        self.__reminder_timer = None
+        # expand the user's home directory only once
+        self.__task_dir = os.path.expanduser(task_dir) if task_dir else None
 
         # Call on_remind as method with the uid as argument to notify
         # listening methods.
         self.__events__ = ('on_remind')
 
+    def __setattr__(self, name, value):
+        super(Task, self).__setattr__(name, value)
+
+        # invalidate the cached task dictionary after any of its values is
+        # changed
+        if name == 'uid' or name in Task.KEYS:
+            with self.__task_lock:
+                self.__task_version += 1
+                self.__task = None
+
     def delete_task(self):
         """Delete the task."""
-        logging.debug('Delete task \'%s\'...' % self.uid)
+        logging.debug('Delete task \'%s\'...', self.uid)
 
         if not self.__check_save_dir():
             return
 
-        task_dir = os.path.expanduser(self.task_dir)
-        task = os.path.join(task_dir, '%s.json' % self.uid)
+        task = os.path.join(self.__task_dir, '%s.json' % self.uid)
 
-        os.remove(task)
+        _writer.write(task, None)
 
-        if self.__reminder_timer:
-            self.__reminder_timer.cancel()
+        scheduler.cancel(self.__reminder_key())
 
     def update_task(self, task):
         """Update the task to the parsed *task* dictionary."""
 
-        logging.debug('Update task \'%s\'...' % self.uid)
-
-        if 'assignee' in task.keys():
-            self.assignee = task['assignee']
-
-        if 'author' in task.keys():
-            self.author = task['author']
+        logging.debug('Update task \'%s\'...', self.uid)
 
-        if 'description' in task.keys():
-            self.description = task['description']
+        for key in Task.KEYS:
+            if key in task:
+                setattr(self, key, task[key])
 
-        if 'done' in task.keys():
-            self.done = task['done']
-
-        if 'due' in task.keys():
-            self.due = task['due']
-
-        if 'reminder' in task.keys():
-            self.reminder = task['reminder']
+        if 'reminder' in task:
             self.__set_reminder()
 
-        if 'title' in task.keys():
-            self.title = task['title']
-
         self.__save_task()
 
     def task(self):
@@ -128,8 +206,16 @@ class Task(Events):
         The dictionary has the keys ``'assignee'``, ``'author'``,
         ``'description'``, ``'done'``, ``'due'``, ``'reminder'``, ``'title'``
         and ``'id'``
+
+        The dictionary is cached until any of its values changes and must
+        therefore not be modified. Make a copy of it instead.
         """
-        return {
+        task = self.__task
+        if task is not None:
+            return task
+
+        version = self.__task_version
+        task = {
             'assignee': self.assignee,
             'author': self.author,
             'description': self.description,
@@ -140,11 +226,18 @@ class Task(Events):
             'id': self.uid
         }
 
+        # don't cache the task if it changed while it was created
+        with self.__task_lock:
+            if version == self.__task_version:
+                self.__task = task
+
+        return task
+
     def __check_save_dir(self):
         """Check if a save directory is defined."""
         if not self.task_dir:
             logging.warning(
-                'No save directory for task \'%s\' set.' % self.uid)
+                'No save directory for task \'%s\' set.', self.uid)
             return False
 
         return True
@@ -154,25 +247,22 @@ class Task(Events):
         if not self.__check_save_dir():
             return
 
-        task_dir = os.path.expanduser(self.task_dir)
-        task = os.path.join(task_dir, '%s.json' % self.uid)
+        task = os.path.join(self.__task_dir, '%s.json' % self.uid)
 
-        try:
-            os.makedirs(task_dir)
-        except FileExistsError:
-            pass
+        if self.__task_dir not in _task_dirs:
+            os.makedirs(self.__task_dir, exist_ok=True)
+            _task_dirs.add(self.__task_dir)
 
-        with open(task, 'w') as f:
-            json.dump(self.task(), f)
+        logging.debug('Queue task \'%s\' to be saved...', self.uid)
+        _writer.write(task, json_dumps(self.task()))
 
     def __set_reminder(self):
         """Set a reminder to call ``on_remind``."""
-        def reminder_alarm():
-            logging.debug('Reminder alarm for \'%s\' triggered...' % self.uid)
+        def reminder_alarm(keys):
+            logging.debug('Reminder alarm for \'%s\' triggered...', self.uid)
             self.on_remind(self.uid)
 
-        if self.__reminder_timer:
-            self.__reminder_timer.cancel()
+        scheduler.cancel(self.__reminder_key())
 
         # the time in seconds until the reminder is due
         time_from_now = int(round(self.due - self.reminder - time.time(), 0))
@@ -180,7 +270,12 @@ class Task(Events):
         if time_from_now < 0 or self.done:
             return
 
-        logging.debug('Set a reminder for \'%s\' which is due in %i seconds...'
-                      % (str(self.uid), time_from_now))
-        self.__reminder_timer = threading.Timer(time_from_now, reminder_alarm)
-        self.__reminder_timer.start()
+        logging.debug('Set a reminder for \'%s\' which is due in %i '
+                      'seconds...', self.uid, time_from_now)
+        scheduler.schedule(self.__reminder_key(), self.due - self.reminder,
+                           reminder_alarm)
+
+    def __reminder_key(self):
+        """Return the key of the task's reminder in the scheduler."""
+        # the key is unique among the jobs of all services
+        return ('task', self.uid)
@@ -16,11 +16,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-import threading
 import time
 
 import requests
 
+from knut.core.scheduler import scheduler
 from .temperature import Temperature
 
 OWM_TO_WEATHER_ICON = {
@@ -45,6 +45,10 @@ OWM_TO_WEATHER_ICON = {
 }
 
 
+# the session is shared by all services to reuse the connection to the API
+_session = requests.Session()
+
+
 class OpenWeatherMap(Temperature):
     """OpenWeatherMap temperature service.
 
@@ -52,6 +56,12 @@ class OpenWeatherMap(Temperature):
     which connects to `OpenWeatherMap's <https://openweathermap.org/api>`_ API.
     """
 
+    INTERVAL = 60
+    """The time in seconds between two requests to the API."""
+
+    # return the weather icon of an OpenWeatherMap icon code
+    _icon_of = staticmethod(OWM_TO_WEATHER_ICON.get)
+
     def __init__(self, location: str, uid: str, appid: str) -> None:
         """Connect to OpenWeatherMap's API to get the weather information for
         the *location*. The unique id *uid* is used within Knut. To connect to
@@ -61,55 +71,95 @@ class OpenWeatherMap(Temperature):
         """
         super(OpenWeatherMap, self).__init__(location, uid)
         self.data = dict()  # stores data received from OpenWeatherMap
-        self.url = str('http://api.openweathermap.org/data/2.5/weather?'
-                       + 'q=' + location
-                       + '&APPID=' + appid)
-
-        # start the data poller daemon
-        daemon_thread = threading.Thread(target=self.daemon,
-                                         name='owm-daemon')
-        daemon_thread.daemon = True
-        daemon_thread.start()
-
-        # start the data logger
-        data_logger_thread = threading.Thread(target=self.data_logger,
-                                              name='owm-logger')
-        data_logger_thread.daemon = True
-        data_logger_thread.start()
-
-    def request_data(self):
-        """Send a HTTP request to the OpenWeatherMap API."""
-        try:
-            self.data = requests.get(self.url).json()
-            self.location = self.data['name']
-            if self.data:
-                self.temperature = self.data['main']['temp']
-                self.condition = OWM_TO_WEATHER_ICON[self.data['weather'][0]['icon']]
-        except:
-            logging.warning('Can not connect to api.openweathermap.org.')
+        self.session = _session
+        """The HTTP session which keeps the connection to the API alive. It is
+        shared by all services."""
+        self.url = 'http://api.openweathermap.org/data/2.5/weather'
+        self.params = {'q': location, 'APPID': appid}
+        """The query parameters of the request, which are URL encoded by the
+        session."""
+
+        self.__etag = None  # the entity tag of the last response
+        self.__last_saved = float()  # when the history was last saved
+
+        # poll the data together with all other services
+        scheduler.schedule(self, time.time(), OpenWeatherMap.__poll_all,
+                           OpenWeatherMap.INTERVAL)
+
+    def request_data(self) -> bool:
+        """Send a HTTP request to the OpenWeatherMap API.
+
+        The request is conditional, so that unchanged data are neither send
+        again nor parsed. Returns True if the current data are received, or
+        False if the request failed or the data are invalid.
+        """
+        headers = dict()
+        if self.__etag:
+            headers['If-None-Match'] = self.__etag
 
-    def daemon(self, s: int=60) -> None:
-        """Request every *s* seconds new weather data.
+        try:
+            response = self.session.get(self.url,
+                                        params=self.params,
+                                        headers=headers,
+                                        timeout=10)
 
-        If the data changed, the :meth:`on_change` event is called.
-        """
-        while True:
-            previus_data = self.data
-            self.request_data()
+            if response.status_code == requests.codes.not_modified:
+                return True  # the data did not change since the last request
 
-            # push data only if changed
-            if previus_data != self.data:
-                self.on_change(self.uid)
+            self.data = response.json()
+        except (requests.RequestException, ValueError):
+            logging.warning('Can not connect to api.openweathermap.org.')
+            return False
 
-            time.sleep(s)
+        try:
+            self.location = self.data['name']
+            self.temperature = self.data['main']['temp']
+            self.condition = self._icon_of(self.data['weather'][0]['icon'],
+                                           'na')
+        except (KeyError, IndexError, TypeError) as e:
+            logging.warning('Invalid data received from '
+                            'api.openweathermap.org: %s', e)
+            self.__etag = None
+            return False
+
+        self.__etag = response.headers.get('ETag')
+        return True
+
+    def refresh(self) -> None:
+        """Request new weather data now instead of waiting for the next poll.
+        """
+        scheduler.wake(self)
+
+    def close(self) -> None:
+        """Stop requesting new weather data."""
+        scheduler.cancel(self)
+
+    @staticmethod
+    def __poll_all(services):
+        """Call :meth:`poll` of all *services* which are due at once."""
+        for service in services:
+            try:
+                service.poll()
+            except Exception:
+                logging.exception('Failed to poll OpenWeatherMap.')
+
+    def poll(self) -> None:
+        """Request new weather data.
+
+        This method is called every :const:`INTERVAL` seconds. If the location,
+        temperature or condition changed, the :meth:`on_change` event is
+        called. Once the first data are received and then every hour, the
+        temperature is saved to the :attr:`history`. Failed requests are not
+        saved, since the temperature is outdated then.
+        """
+        previous = (self.location, self.temperature, self.condition)
+        received = self.request_data()
 
-    def data_logger(self):
-        """Save every hour the temperature history."""
-        # wait for first value to be written to history
-        while len(self.history[0]) == 0:
-            self.save_data()
-            time.sleep(1)
+        # push data only if the status of the back-end changed
+        if previous != (self.location, self.temperature, self.condition):
+            self.on_change(self.uid)
 
-        while True:
-            time.sleep(3600)
+        now = time.time()
+        if received and now - self.__last_saved >= 3600:
             self.save_data()
+            self.__last_saved = now
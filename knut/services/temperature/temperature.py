@@ -13,17 +13,92 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from events import Events
+import atexit
+import functools
 import logging
 import os
-import pathlib
-import pickle
+import queue
+import threading
 import time
 
+import numpy
+
+
+@functools.lru_cache(maxsize=None)
+def _make_dir(path):
+    """Make the directory *path* once per process."""
+    os.makedirs(path, exist_ok=True)
+
+
+class _HistoryWriter():
+    """Write the temperature history files from one background thread.
+
+    The writes are done in the order in which they are submitted, so that e.g.
+    records appended after truncating a history file are kept.
+    """
+
+    def __init__(self):
+        self.__queue = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+    def submit(self, function, *args):
+        """Call the *function* with the *args* from the writer thread."""
+        with self.__lock:
+            if not self.__thread:
+                self.__thread = threading.Thread(target=self.__run,
+                                                 name='temperature-writer',
+                                                 daemon=True)
+                self.__thread.start()
+
+        self.__queue.put((function, args))
+
+    def flush(self):
+        """Block until all submitted writes are done."""
+        self.__queue.join()
+
+    def __run(self):
+        while True:
+            function, args = self.__queue.get()
+
+            try:
+                function(*args)
+            except OSError as e:
+                logging.error('Failed to write temperature history: %s', e)
+            finally:
+                self.__queue.task_done()
+
+
+_writer = _HistoryWriter()
+
+# registered before any service flushes its records at exit, so that it is
+# called after them
+atexit.register(_writer.flush)
+
 
 class Temperature(Events):
     """Base class for temperature services."""
     # location where temperature history data are stored
-    DATA_DIR = str(pathlib.Path.home()) + '/.local/share/knut/'
+    DATA_DIR = os.path.join(os.path.expanduser('~'), '.local', 'share', 'knut')
+
+    RECORD = numpy.dtype([('time', '<f8'), ('temperature', '<f8')])
+    """The record of a sample in the history which holds the UNIX timestamp
+    and the temperature as little-endian doubles. The history file is a
+    sequence of these records following the :const:`HEADER`."""
+
+    HEADER = b'KNUT' + bytes([1])
+    """The magic bytes and version at the head of a history file."""
+
+    CAPACITY = 1440
+    """The number of records for which the history is initially allocated,
+    which is a day of samples taken every minute."""
+
+    FLUSH_RECORDS = 10
+    """The number of new records after which the history file is appended."""
+
+    FLUSH_INTERVAL = 600
+    """The time in seconds after which new records are appended to the history
+    file, even if there are less than :const:`FLUSH_RECORDS`."""
 
     def __init__(self, location, uid, **kwargs):
         self.location = location
@@ -32,7 +107,7 @@ class Temperature(Events):
         self.uid = uid
         """The identifier of the temperature service."""
 
-        self.data_file = Temperature.DATA_DIR + uid
+        self.data_file = os.path.join(Temperature.DATA_DIR, uid + '.history')
 
         self.temperature = 0
         """Temperature in Kelvin."""
@@ -43,16 +118,48 @@ class Temperature(Events):
         the current weather condition.
         """
 
-        self.history = [list(), list()]
-        """A nested list where ``history[0]`` is a list of the :attr:`temperature`
-        values and ``history[1]`` the UNIX timestamps.
-        """
+        # the history records are kept in the preallocated buffer of which the
+        # first __size records are used
+        self.__buffer = numpy.empty(Temperature.CAPACITY,
+                                    dtype=Temperature.RECORD)
+        self.__size = 0
+
+        # the number of records which are written to the history file and the
+        # monotonic time of the last write
+        self.__flushed = 0
+        self.__last_flush = time.monotonic()
+
+        # the end of the day of the last record in seconds since the epoch
+        self.__day_end = float()
+
+        # serializes changes of the history and writes to the history file
+        self.__lock = threading.Lock()
 
         self.make_user_dir()
         self.load_data()
 
+        atexit.register(self.flush)
+
         self.__events__ = ('on_change')
 
+    @property
+    def records(self):
+        """The temperature history as array of :const:`RECORD`.
+
+        The array is a view of the history buffer and must not be modified.
+        """
+        return self.__buffer[:self.__size]
+
+    @property
+    def history(self):
+        """A nested list where ``history[0]`` is a list of the :attr:`temperature`
+        values and ``history[1]`` the UNIX timestamps.
+
+        The lists are created from the :attr:`records` on each access.
+        """
+        records = self.records
+        return [records['temperature'].tolist(), records['time'].tolist()]
+
     def load_data(self):
         """Load temperature history from file.
 
@@ -61,52 +168,142 @@ class Temperature(Events):
         """
         try:
             with open(self.data_file, 'rb') as f:
-                logging.info('Load temperature history for \'%s\'...'
-                             % self.uid)
-                # read the data file as binary data stream
-                self.history = pickle.load(f)
-                self.check_history()
+                logging.info('Load temperature history for \'%s\'...',
+                             self.uid)
+                header = f.read(len(Temperature.HEADER))
+                size = ((os.fstat(f.fileno()).st_size - len(header))
+                        // Temperature.RECORD.itemsize)
+                records = numpy.fromfile(f, dtype=Temperature.RECORD,
+                                         count=size)
         except FileNotFoundError:
-            logging.warning('Failed to load temperature history for \'%s\'.'
-                            % self.uid)
+            logging.warning('Failed to load temperature history for \'%s\'.',
+                            self.uid)
+            return
+
+        if header != Temperature.HEADER:
+            # the history is never interpreted if the format is unknown
+            logging.warning('Unknown format of the temperature history file '
+                            '\'%s\'.', self.data_file)
+            self.__truncate()
+            return
+
+        # drop an incomplete record, e.g. of an interrupted write, at the end
+        # of the file so that new records are appended aligned
+        self.__truncate(len(records))
+
+        self.__buffer = numpy.empty(max(Temperature.CAPACITY, 2*len(records)),
+                                    dtype=Temperature.RECORD)
+        self.__buffer[:len(records)] = records
+        self.__size = len(records)
+        self.__flushed = self.__size
+        self.check_history()
 
     def save_data(self):
-        """Appends the current temperature to the :attr:`history` and writes the
-        pickled representation of :attr:`history` to a file.
+        """Appends the current temperature to the :attr:`history` and to the
+        history file.
+
+        The history file is only appended by the binary :const:`RECORD` of new
+        temperatures instead of writing the whole history. The records are
+        written in batches of :const:`FLUSH_RECORDS` or after the
+        :const:`FLUSH_INTERVAL`. Call :meth:`flush()` to write them
+        immediately.
         """
         # check if temperature is valid before adding it to the history
         if self.temperature < 0:
             return
 
-        self.check_history()
-        self.history[0].append(self.temperature)
-        self.history[1].append(time.time())
+        with self.__lock:
+            self.check_history()
+
+            if self.__size == len(self.__buffer):
+                # double the buffer instead of growing it by each record
+                buffer = numpy.empty(2*len(self.__buffer),
+                                     dtype=Temperature.RECORD)
+                buffer[:self.__size] = self.__buffer
+                self.__buffer = buffer
+
+            self.__buffer[self.__size] = (time.time(), self.temperature)
+            self.__size += 1
+
+            if (self.__size - self.__flushed >= Temperature.FLUSH_RECORDS
+                    or time.monotonic() - self.__last_flush
+                    >= Temperature.FLUSH_INTERVAL):
+                self.__flush()
+
+    def flush(self):
+        """Append all records to the history file which are not yet written.
 
-        with open(self.data_file, 'wb') as f:
-            # store the data as binary data stream
-            logging.debug('Write temperature history of \'%s\' to file...' %
+        The history file is written by a background thread to not block the
+        thread which samples the temperature. This is called when the
+        interpreter exits.
+        """
+        with self.__lock:
+            self.__flush()
+
+    def __flush(self):
+        self.__last_flush = time.monotonic()
+
+        if self.__flushed == self.__size:
+            return
+
+        _writer.submit(self.__append,
+                       self.__buffer[self.__flushed:self.__size].tobytes())
+        self.__flushed = self.__size
+
+    def __append(self, data):
+        """Append the *data* of records to the history file."""
+        with open(self.data_file, 'ab') as f:
+            logging.debug('Append temperature to history file of \'%s\'...',
                           self.uid)
-            pickle.dump(self.history, f)
+            if not f.tell():
+                f.write(Temperature.HEADER)
+            f.write(data)
 
     def check_history(self):
         """Checks if the :attr:`history` is from the current day and clears the
         :attr:`history` if not.
         """
         # check first if data are in history
-        if len(self.history[1]) < 1:
+        if self.__size < 1:
             return
 
-        day_today = time.localtime().tm_mday
-        day_history = time.localtime(self.history[1][-1]).tm_mday
+        now = time.time()
+
+        # the history is valid at least until the end of the day of its last
+        # record
+        if now < self.__day_end:
+            return
 
-        if (day_today > day_history):
-            logging.info('Clearing temperature history of \'%s\'...'
-                         % self.uid)
-            self.history = [list(), list()]
+        # compare the local dates, since the day of the month alone does not
+        # change to a larger value at the turn of a month
+        today = time.localtime(now)[:3]
+        last = time.localtime(self.__buffer['time'][self.__size - 1])
+
+        self.__day_end = time.mktime((last.tm_year, last.tm_mon,
+                                      last.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+        if today > last[:3]:
+            logging.info('Clearing temperature history of \'%s\'...',
+                         self.uid)
+            if self.__flushed:
+                _writer.submit(self.__truncate, 0)
+
+            self.__size = 0
+            self.__flushed = 0
+
+    def __truncate(self, size=None):
+        """Truncate the history file after *size* records.
+
+        If *size* is None, the history file is rewritten with only the
+        :const:`HEADER`.
+        """
+        if size is None:
+            with open(self.data_file, 'wb') as f:
+                f.write(Temperature.HEADER)
+        else:
+            os.truncate(self.data_file, len(Temperature.HEADER)
+                        + size*Temperature.RECORD.itemsize)
 
     def make_user_dir(self):
         """Makes a user data directory if it does not exists."""
-        try:
-            os.makedirs(Temperature.DATA_DIR)
-        except FileExistsError:
-            pass
+        _make_dir(Temperature.DATA_DIR)
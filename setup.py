@@ -15,16 +15,11 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
-from distutils.core import setup
+from setuptools import find_packages, setup
 
 setup(name='Knut Server',
       description='Knut: your humble server!',
       author='Joe Pearson',
       author_email='pearjo@protonmail.com',
       scripts=['scripts/knutserver'],
-      packages=['knut.apis',
-                'knut.core',
-                'knut.server',
-                'knut.services',
-                'knut.services.light',
-                'knut.services.temperature'])
+      packages=find_packages(include=['knut', 'knut.*']))